@@ -1,8 +1,25 @@
 from django.contrib import admin
-from .models import User
+from .models import AuthEvent, User
 # Register your models here.
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ('email', 'name', 'is_active', 'is_staff')
     search_fields = ('email', 'name')
     readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(AuthEvent)
+class AuthEventAdmin(admin.ModelAdmin):
+    list_display = ('event_type', 'email', 'ip_address', 'created_at')
+    list_filter = ('event_type',)
+    search_fields = ('email',)
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
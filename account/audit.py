@@ -0,0 +1,263 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, InterfaceError, OperationalError, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .db import serialized_write
+from .models import AuthEvent, User
+
+logger = logging.getLogger(__name__)
+
+
+class AuthEventBuffer:
+    """
+    Collects auth events in memory and writes them with one bulk_create.
+
+    A flush happens once max_size events are pending or flush_interval
+    seconds have passed. With background=True the flush runs on a daemon
+    thread instead of the request thread. Events that cannot be written
+    because the database is unavailable are appended to a per-process spool
+    file (spool_path suffixed with the pid) and replayed on the next flush.
+    If the batch is rejected for any other reason, events are retried one by
+    one; those that still fail are kept in spool_path.rejected for inspection
+    and are not replayed.
+    """
+
+    def __init__(self, max_size=100, flush_interval=5.0, spool_path=None, background=True):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self.background = background
+
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            max_size=settings.AUTH_EVENT_BUFFER_SIZE,
+            flush_interval=settings.AUTH_EVENT_FLUSH_INTERVAL,
+            spool_path=settings.AUTH_EVENT_SPOOL_PATH,
+            background=settings.AUTH_EVENT_BACKGROUND_FLUSH,
+        )
+
+    def add(self, **fields):
+        fields.setdefault('created_at', timezone.now())
+        with self._lock:
+            self._events.append(fields)
+            due = (len(self._events) >= self.max_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+
+        if not self.background:
+            if due:
+                try:
+                    self.flush()
+                except Exception:
+                    # Recording an event must never fail the request it describes.
+                    logger.exception('Auth event flush failed')
+            return
+
+        self._start_thread()
+        if due:
+            self._wakeup.set()
+
+    def flush(self):
+        with self._flush_lock:
+            spooled = self._read_spool()
+            with self._lock:
+                events, self._events = spooled + self._events, []
+                self._last_flush = time.monotonic()
+            if not events:
+                return 0
+
+            try:
+                self._insert(events)
+            except (OperationalError, InterfaceError):
+                logger.exception('Could not write %d auth events, spooling to %s', len(events), self._spool_file())
+                self._write_spool(events)
+                return 0
+            except (DatabaseError, TypeError, ValueError):
+                logger.exception('Could not write %d auth events in one batch, retrying one by one', len(events))
+                return self._insert_one_by_one(events)
+            return len(events)
+
+    def _insert(self, events):
+        # The existence check shares the insert's transaction, so a user can't be deleted in between.
+        with serialized_write(), transaction.atomic():
+            self._unlink_deleted_users(events)
+            AuthEvent.objects.bulk_create(
+                [AuthEvent(**fields) for fields in events],
+                batch_size=self.max_size,
+            )
+
+    def _insert_one_by_one(self, events):
+        written = 0
+        rejected = []
+        for position, fields in enumerate(events):
+            attempts = [fields, {**fields, 'user_id': None}] if fields.get('user_id') else [fields]
+            for attempt in attempts:
+                try:
+                    self._insert([attempt])
+                except (OperationalError, InterfaceError):
+                    logger.exception('Could not write %d auth events, spooling to %s',
+                                     len(events) - position, self._spool_file())
+                    self._write_spool(events[position:])
+                    self._write_rejected(rejected)
+                    return written
+                except (DatabaseError, TypeError, ValueError):
+                    continue
+                written += 1
+                break
+            else:
+                rejected.append(fields)
+
+        self._write_rejected(rejected)
+        return written
+
+    def _unlink_deleted_users(self, events):
+        # The user may have been deleted since the event was recorded; keep the event, drop the link.
+        user_ids = {fields['user_id'] for fields in events if fields.get('user_id')}
+        if not user_ids:
+            return
+        existing = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        for fields in events:
+            if fields.get('user_id') and fields['user_id'] not in existing:
+                fields['user_id'] = None
+
+    def close(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval)
+        self.flush()
+
+    def _start_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='auth-event-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Auth event flush failed')
+            finally:
+                # The flusher thread owns its own connection; don't keep it open between flushes.
+                connections.close_all()
+
+    def _spool_file(self, pid=None):
+        return f'{self.spool_path}.{pid or os.getpid()}'
+
+    def _claimable_spools(self):
+        """
+        This process's spool file, plus files left behind by workers that have exited.
+
+        Live workers only ever append to their own file, so claiming a file never
+        races with a writer.
+        """
+        paths = [self._spool_file()]
+        if os.name != 'posix':
+            return paths
+
+        for path in glob.glob(glob.escape(self.spool_path) + '.*'):
+            pid = path[len(self.spool_path) + 1:].split('.')[0]
+            if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+                paths.append(path)
+        return paths
+
+    def _read_spool(self):
+        if not self.spool_path:
+            return []
+
+        events = []
+        for path in self._claimable_spools():
+            claimed = f'{self._spool_file()}.replay'
+            try:
+                # Atomic, so two workers can't replay the same orphaned file.
+                os.rename(path, claimed)
+            except OSError:
+                continue
+
+            with open(claimed) as spool:
+                for number, line in enumerate(spool, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        fields = json.loads(line)
+                        fields['created_at'] = parse_datetime(fields['created_at'])
+                        if fields['created_at'] is None:
+                            raise ValueError(line)
+                    except (ValueError, KeyError, TypeError):
+                        logger.warning('Skipping unreadable line %d in auth event spool %s', number, path)
+                        continue
+                    events.append(fields)
+            os.remove(claimed)
+        return events
+
+    def _write_spool(self, events):
+        if not self.spool_path:
+            logger.error('Dropping %d auth events, AUTH_EVENT_SPOOL_PATH is not set', len(events))
+            return
+        self._append(self._spool_file(), events)
+
+    def _write_rejected(self, events):
+        if not events:
+            return
+        if not self.spool_path:
+            logger.error('Dropping %d auth events that cannot be written, AUTH_EVENT_SPOOL_PATH is not set', len(events))
+            return
+        logger.error('Could not write %d auth events, keeping them in %s.rejected', len(events), self.spool_path)
+        self._append(f'{self.spool_path}.rejected', events)
+
+    def _append(self, path, events):
+        try:
+            with open(path, 'a') as spool:
+                for fields in events:
+                    spool.write(json.dumps(fields, default=str) + '\n')
+        except OSError:
+            logger.exception('Dropping %d auth events, could not write to %s', len(events), path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+auth_events = AuthEventBuffer.from_settings()
+atexit.register(auth_events.close)
+
+
+def record_auth_event(event_type, request, user=None, email=''):
+    auth_events.add(
+        event_type=event_type,
+        user_id=user.pk if user else None,
+        email=user.email if user else email,
+        ip_address=request.META.get('REMOTE_ADDR') or None,
+        user_agent=request.META.get('HTTP_USER_AGENT', '')[:255],
+    )
@@ -0,0 +1,30 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+
+_write_lock = threading.RLock()
+
+
+@contextmanager
+def serialized_write():
+    """
+    Run a block of writes while holding the process-wide writer lock.
+
+    SQLite allows a single writer per database, so letting request threads
+    queue here is cheaper than having them race for the file lock and fail
+    with "database is locked". Other processes are still covered by
+    busy_timeout. No-op unless SQLITE_SERIALIZE_WRITES is enabled.
+
+    The lock is always taken before the transaction is opened. Inside an
+    existing atomic block the transaction already holds SQLite's write lock
+    (transaction_mode is IMMEDIATE), so waiting for the Python lock there
+    would take the two locks in the opposite order and could deadlock.
+    """
+    if not settings.SQLITE_SERIALIZE_WRITES or connection.in_atomic_block:
+        yield
+        return
+
+    with _write_lock, transaction.atomic():
+        yield
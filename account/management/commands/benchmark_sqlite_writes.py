@@ -0,0 +1,168 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.test.utils import override_settings
+
+from account.models import User
+
+# Reserved by RFC 2606, so no real account can use it.
+BENCH_EMAIL_DOMAIN = '@bench.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        'Hammer the default SQLite database with concurrent user writes and report '
+        'writes/sec and the "database is locked" error rate.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Writer threads per process.')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Worker processes, like gunicorn workers sharing one database file.')
+        parser.add_argument('--ops', type=int, default=50, help='Write rounds per thread.')
+        parser.add_argument('--compare', action='store_true',
+                            help='Run against scratch databases with SQLITE_PRODUCTION off and on.')
+        parser.add_argument('--allow-live-database', action='store_true',
+                            help='Run against the configured database even though SQLITE_PATH is not set.')
+        # Used internally to run one of several worker processes.
+        parser.add_argument('--worker', type=int, default=None, help=argparse.SUPPRESS)
+        parser.add_argument('--start-at', type=float, default=None, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            return self.compare(options)
+        if 'SQLITE_PATH' not in os.environ and not options['allow_live_database']:
+            raise CommandError(
+                'Refusing to write benchmark users to the default database. Use --compare, point '
+                'SQLITE_PATH at a scratch file, or pass --allow-live-database.'
+            )
+
+        # Password hashing would dominate the timings; this measures the database.
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            if options['worker'] is not None:
+                return self.run_worker(options)
+            if options['processes'] > 1:
+                writes, lock_errors, elapsed = self.run_processes(options)
+            else:
+                writes, lock_errors, elapsed = self.run_workload(options['threads'], options['ops'])
+
+        attempts = writes + lock_errors
+        self.stdout.write(
+            f"SQLITE_PRODUCTION={settings.SQLITE_PRODUCTION}, "
+            f"{options['processes']} process(es) x {options['threads']} thread(s): "
+            f"{writes} writes in {elapsed:.2f}s ({writes / elapsed if elapsed else 0:.0f} writes/sec), "
+            f"{lock_errors} lock errors ({lock_errors / attempts if attempts else 0:.1%})"
+        )
+
+    def run_processes(self, options):
+        # Give every worker time to start Django before the shared start time.
+        start_at = time.time() + 3
+        workers = [
+            subprocess.Popen(
+                self.manage_command() + [
+                    'benchmark_sqlite_writes', '--threads', str(options['threads']), '--ops', str(options['ops']),
+                    '--worker', str(n), '--start-at', str(start_at),
+                ] + (['--allow-live-database'] if options['allow_live_database'] else []),
+                cwd=settings.BASE_DIR, stdout=subprocess.PIPE, text=True,
+            )
+            for n in range(options['processes'])
+        ]
+
+        writes = lock_errors = 0
+        finished_at = start_at
+        for worker in workers:
+            output, _ = worker.communicate()
+            if worker.returncode:
+                raise CommandError(f'Benchmark worker exited with status {worker.returncode}')
+            worker_writes, worker_lock_errors, worker_finished_at = output.split()[-3:]
+            writes += int(worker_writes)
+            lock_errors += int(worker_lock_errors)
+            finished_at = max(finished_at, float(worker_finished_at))
+        return writes, lock_errors, finished_at - start_at
+
+    def run_worker(self, options):
+        time.sleep(max(0, options['start_at'] - time.time()))
+        writes, lock_errors, _ = self.run_workload(options['threads'], options['ops'], prefix=f"w{options['worker']}-")
+        self.stdout.write(f'{writes} {lock_errors} {time.time()}')
+
+    def run_workload(self, threads, ops, prefix=''):
+        self.delete_bench_users(prefix)
+        counts = {'writes': 0, 'lock_errors': 0}
+        counts_lock = threading.Lock()
+
+        def worker(n):
+            writes = lock_errors = 0
+            for i in range(ops):
+                steps = (
+                    lambda: User.objects.create_user(f'{prefix}{n}-{i}{BENCH_EMAIL_DOMAIN}', 'bench-password', name='Bench'),
+                    lambda: self.change_password(f'{prefix}{n}-{i}{BENCH_EMAIL_DOMAIN}'),
+                    lambda: self.toggle_active(f'{prefix}{n}-{i}{BENCH_EMAIL_DOMAIN}'),
+                )
+                for step in steps:
+                    try:
+                        step()
+                        writes += 1
+                    except User.DoesNotExist:
+                        break
+                    except OperationalError as exc:
+                        if 'locked' not in str(exc):
+                            raise
+                        lock_errors += 1
+            connections.close_all()
+            with counts_lock:
+                counts['writes'] += writes
+                counts['lock_errors'] += lock_errors
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        self.delete_bench_users(prefix)
+        return counts['writes'], counts['lock_errors'], elapsed
+
+    def delete_bench_users(self, prefix):
+        User.objects.filter(email__startswith=prefix, email__endswith=BENCH_EMAIL_DOMAIN).delete()
+
+    # Read-modify-write in one transaction, like the admin change view. With
+    # deferred transactions SQLite can't wait out the lock upgrade and fails
+    # immediately with "database is locked", whatever the busy timeout.
+    def change_password(self, email):
+        with transaction.atomic():
+            user = User.objects.get(email=email)
+            user.set_password('bench-password-2')
+            user.save()
+
+    def toggle_active(self, email):
+        with transaction.atomic():
+            user = User.objects.get(email=email)
+            user.is_active = not user.is_active
+            user.save(update_fields=['is_active'])
+
+    def manage_command(self):
+        return [sys.executable, '-m', 'django']
+
+    def compare(self, options):
+        for mode in ('False', 'True'):
+            with tempfile.TemporaryDirectory() as tmp:
+                env = {**os.environ, 'SQLITE_PRODUCTION': mode, 'SQLITE_PATH': os.path.join(tmp, 'bench.sqlite3')}
+                subprocess.run(self.manage_command() + ['migrate', '--verbosity', '0'],
+                               env=env, cwd=settings.BASE_DIR, check=True)
+                subprocess.run(
+                    self.manage_command() + [
+                        'benchmark_sqlite_writes', '--threads', str(options['threads']), '--ops', str(options['ops']),
+                        '--processes', str(options['processes']),
+                    ],
+                    env=env, cwd=settings.BASE_DIR, check=True,
+                )
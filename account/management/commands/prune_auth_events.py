@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from account.models import AuthEvent
+
+
+class Command(BaseCommand):
+    help = 'Delete auth events older than the retention period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.AUTH_EVENT_RETENTION_DAYS,
+                            help='Keep events from the last N days (default: AUTH_EVENT_RETENTION_DAYS).')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Rows deleted per statement, to keep write locks short.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired = AuthEvent.objects.filter(created_at__lt=cutoff).order_by('created_at')
+
+        deleted = 0
+        while True:
+            ids = list(expired.values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted += AuthEvent.objects.filter(pk__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} auth events older than {cutoff:%Y-%m-%d %H:%M:%S}'))
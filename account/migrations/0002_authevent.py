@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('login', 'Login'), ('login_failed', 'Failed login'), ('password_change', 'Password change'), ('password_reset', 'Password reset'), ('email_verified', 'Email verified')], max_length=32)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='auth_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['event_type', 'created_at'], name='account_aut_event_t_521780_idx'), models.Index(fields=['user', 'created_at'], name='account_aut_user_id_6b36dc_idx')],
+            },
+        ),
+    ]
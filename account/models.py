@@ -1,5 +1,7 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser,PermissionsMixin
+from .db import serialized_write
 from .managers import CustomUserManager
 
 class User(AbstractBaseUser,PermissionsMixin):
@@ -22,4 +24,38 @@ class User(AbstractBaseUser,PermissionsMixin):
     objects = CustomUserManager()
 
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+    def save(self, *args, **kwargs):
+        # create_user, set_password() + save() and is_active updates all land here.
+        with serialized_write():
+            super().save(*args, **kwargs)
+
+
+class AuthEvent(models.Model):
+
+    class EventType(models.TextChoices):
+        LOGIN = 'login', 'Login'
+        LOGIN_FAILED = 'login_failed', 'Failed login'
+        PASSWORD_CHANGE = 'password_change', 'Password change'
+        PASSWORD_RESET = 'password_reset', 'Password reset'
+        EMAIL_VERIFIED = 'email_verified', 'Email verified'
+
+    event_type = models.CharField(max_length=32, choices=EventType.choices)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name='auth_events')
+    email = models.EmailField(blank=True)
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+
+    # Set when the event is recorded, not when the buffer is flushed.
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['event_type', 'created_at']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} {self.email} {self.created_at:%Y-%m-%d %H:%M:%S}'
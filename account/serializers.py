@@ -139,6 +139,7 @@ class UserPasswordResetSerializer(serializers.Serializer):
             
             user.set_password(password)
             user.save()
+            attrs['user'] = user
             return attrs
         except DjangoUnicodeDecodeError:
             raise serializers.ValidationError('Token is not valid or expired')
@@ -193,6 +194,7 @@ class VerifyEmailSerializer(serializers.Serializer):
             
             user.is_active = True
             user.save()
+            attrs['user'] = user
             return attrs
         except DjangoUnicodeDecodeError:
             raise serializers.ValidationError('Token is not valid or expired')
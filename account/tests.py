@@ -1,3 +1,280 @@
-from django.test import TestCase
+import json
+import os
+import runpy
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.core.management import CommandError, call_command
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+
+from .audit import AuthEventBuffer
+from .models import AuthEvent, User
+
+
+class AuthEventBufferTests(TestCase):
+
+    def setUp(self):
+        self.spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.spool_dir.cleanup)
+        self.spool_path = os.path.join(self.spool_dir.name, 'auth_events.spool')
+
+    def make_buffer(self, **kwargs):
+        kwargs.setdefault('max_size', 100)
+        kwargs.setdefault('flush_interval', 60)
+        return AuthEventBuffer(spool_path=self.spool_path, background=False, **kwargs)
+
+    def add_event(self, buffer, **fields):
+        buffer.add(event_type=AuthEvent.EventType.LOGIN, email='user@example.com', **fields)
+
+    def test_flushes_when_size_threshold_reached(self):
+        buffer = self.make_buffer(max_size=3)
+        self.add_event(buffer)
+        self.add_event(buffer)
+        self.assertEqual(AuthEvent.objects.count(), 0)
+
+        self.add_event(buffer)
+        self.assertEqual(AuthEvent.objects.count(), 3)
+
+    def test_flushes_when_time_threshold_reached(self):
+        buffer = self.make_buffer()
+        self.add_event(buffer)
+        self.assertEqual(AuthEvent.objects.count(), 0)
+
+        buffer._last_flush -= 61
+        self.add_event(buffer)
+        self.assertEqual(AuthEvent.objects.count(), 2)
+
+    def test_spools_and_replays_when_database_unavailable(self):
+        buffer = self.make_buffer()
+        self.add_event(buffer)
+
+        with mock.patch.object(AuthEvent.objects, 'bulk_create', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('account.audit', 'ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertTrue(os.path.exists(buffer._spool_file()))
+        self.assertEqual(AuthEvent.objects.count(), 0)
+
+        self.assertEqual(buffer.flush(), 1)
+        self.assertFalse(os.path.exists(buffer._spool_file()))
+        self.assertEqual(AuthEvent.objects.get().email, 'user@example.com')
+
+    def test_skips_unreadable_spool_lines(self):
+        buffer = self.make_buffer()
+        self.add_event(buffer)
+        with mock.patch.object(AuthEvent.objects, 'bulk_create', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('account.audit', 'ERROR'):
+            buffer.flush()
+        with open(buffer._spool_file(), 'a') as spool:
+            spool.write('{"event_type": "login", "ema')
+
+        self.add_event(buffer)
+        with self.assertLogs('account.audit', 'WARNING'):
+            self.assertEqual(buffer.flush(), 2)
+        self.assertFalse(os.path.exists(buffer._spool_file()))
+
+    def test_keeps_event_of_deleted_user(self):
+        user = User.objects.create_user('user@example.com', 'password', name='User')
+        buffer = self.make_buffer()
+        self.add_event(buffer, user_id=user.pk)
+        user.delete()
+
+        self.assertEqual(buffer.flush(), 1)
+        event = AuthEvent.objects.get()
+        self.assertIsNone(event.user_id)
+        self.assertEqual(event.email, 'user@example.com')
+
+
+    def test_rejects_unwritable_spool_lines_without_losing_others(self):
+        with open(f'{self.spool_path}.{os.getpid()}', 'w') as spool:
+            spool.write(json.dumps({'event_type': 'login', 'removed_field': 1, 'created_at': timezone.now().isoformat()}) + '\n')
+        buffer = self.make_buffer()
+        self.add_event(buffer)
+
+        with self.assertLogs('account.audit', 'ERROR'):
+            self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(AuthEvent.objects.get().email, 'user@example.com')
+        with open(f'{self.spool_path}.rejected') as rejected:
+            self.assertIn('removed_field', rejected.read())
+
+    def test_add_does_not_raise_when_event_cannot_be_stored(self):
+        buffer = AuthEventBuffer(max_size=1, background=False, spool_path=os.path.join(self.spool_path, 'missing', 'spool'))
+
+        with mock.patch.object(AuthEvent.objects, 'bulk_create', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('account.audit', 'ERROR') as logs:
+            self.add_event(buffer)
+        self.assertIn('Dropping 1 auth events', '\n'.join(logs.output))
+
+
+class AuthEventBufferCommitTests(TransactionTestCase):
+
+    def test_foreign_key_failure_at_commit_keeps_the_batch(self):
+        user = User.objects.create_user('user@example.com', 'password', name='User')
+        buffer = AuthEventBuffer(background=False, spool_path=None)
+        for _ in range(5):
+            buffer.add(event_type=AuthEvent.EventType.LOGIN, email='other@example.com')
+        buffer.add(event_type=AuthEvent.EventType.LOGIN, user_id=user.pk, email=user.email)
+        user.delete()
+
+        # Simulate the user disappearing after the existence check.
+        with mock.patch.object(AuthEventBuffer, '_unlink_deleted_users'), self.assertLogs('account.audit', 'ERROR'):
+            self.assertEqual(buffer.flush(), 6)
+        self.assertEqual(AuthEvent.objects.count(), 6)
+        self.assertIsNone(AuthEvent.objects.get(email='user@example.com').user_id)
+
+
+class PruneAuthEventsTests(TestCase):
+
+    def test_deletes_only_expired_events(self):
+        now = timezone.now()
+        old = AuthEvent.objects.create(event_type=AuthEvent.EventType.LOGIN, created_at=now - timedelta(days=31))
+        recent = AuthEvent.objects.create(event_type=AuthEvent.EventType.LOGIN, created_at=now - timedelta(days=29))
+
+        call_command('prune_auth_events', days=30, batch_size=1, stdout=StringIO())
+
+        self.assertFalse(AuthEvent.objects.filter(pk=old.pk).exists())
+        self.assertTrue(AuthEvent.objects.filter(pk=recent.pk).exists())
+
+
+class AuthEventViewTests(TestCase):
+
+    def setUp(self):
+        buffer = AuthEventBuffer(max_size=1, background=False, spool_path=None)
+        patcher = mock.patch('account.audit.auth_events', buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = APIClient()
+        self.user = User.objects.create_user('user@example.com', 'old-password', name='User')
+
+    def assertRecorded(self, event_type, user=None):
+        event = AuthEvent.objects.get()
+        self.assertEqual(event.event_type, event_type)
+        self.assertEqual(event.user, user)
+        self.assertEqual(event.email, 'user@example.com')
+
+    def url_args(self):
+        uid = urlsafe_base64_encode(force_bytes(self.user.pk))
+        return [uid, PasswordResetTokenGenerator().make_token(self.user)]
+
+    def test_login(self):
+        response = self.client.post(reverse('login-user'), {'email': 'user@example.com', 'password': 'old-password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertRecorded(AuthEvent.EventType.LOGIN, self.user)
+
+    def test_failed_login(self):
+        response = self.client.post(reverse('login-user'), {'email': 'user@example.com', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 400)
+        self.assertRecorded(AuthEvent.EventType.LOGIN_FAILED)
+
+    def test_login_succeeds_when_event_cannot_be_stored(self):
+        buffer = AuthEventBuffer(max_size=1, background=False, spool_path='/nonexistent/auth_events.spool')
+        with mock.patch('account.audit.auth_events', buffer), \
+                mock.patch.object(AuthEvent.objects, 'bulk_create', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('account.audit', 'ERROR'):
+            response = self.client.post(reverse('login-user'), {'email': 'user@example.com', 'password': 'old-password'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_failed_login_with_non_object_body(self):
+        response = self.client.post(reverse('login-user'), ['user@example.com'], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(AuthEvent.objects.get().email, '')
+
+    def test_change_password(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('change-password'), {
+            'old_password': 'old-password', 'password': 'new-password', 'password2': 'new-password',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertRecorded(AuthEvent.EventType.PASSWORD_CHANGE, self.user)
+
+    def test_password_reset(self):
+        response = self.client.post(reverse('reset-password', args=self.url_args()), {
+            'password': 'new-password', 'password2': 'new-password',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertRecorded(AuthEvent.EventType.PASSWORD_RESET, self.user)
+
+    def test_verify_email(self):
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('verify-email', args=self.url_args()))
+        self.assertEqual(response.status_code, 200)
+        self.assertRecorded(AuthEvent.EventType.EMAIL_VERIFIED, self.user)
+
+
+class SQLiteProductionSettingsTests(TestCase):
+
+    def load_settings(self, **env):
+        with mock.patch.dict(os.environ, env):
+            for name in ('SQLITE_PRODUCTION', 'SQLITE_SERIALIZE_WRITES', 'SQLITE_BUSY_TIMEOUT_MS'):
+                if name not in env:
+                    os.environ.pop(name, None)
+            return runpy.run_path(os.path.join(settings.BASE_DIR, 'djangoauthapi_and_jwt', 'settings.py'))
+
+    def test_production_mode_options(self):
+        namespace = self.load_settings(SQLITE_PRODUCTION='True', SQLITE_BUSY_TIMEOUT_MS='2000')
+        database = namespace['DATABASES']['default']
+
+        self.assertEqual(database['CONN_MAX_AGE'], 600)
+        self.assertEqual(database['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+        self.assertEqual(database['OPTIONS']['timeout'], 2)
+        for pragma in ('journal_mode=WAL', 'synchronous=NORMAL', 'busy_timeout=2000', 'mmap_size=', 'cache_size='):
+            self.assertIn(f'PRAGMA {pragma}', database['OPTIONS']['init_command'])
+        self.assertTrue(namespace['SQLITE_SERIALIZE_WRITES'])
+
+    def test_default_mode_leaves_database_untouched(self):
+        namespace = self.load_settings()
+
+        self.assertNotIn('OPTIONS', namespace['DATABASES']['default'])
+        self.assertFalse(namespace['SQLITE_SERIALIZE_WRITES'])
+
+
+class BenchmarkSQLiteWritesTests(TestCase):
+
+    def test_refuses_default_database(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('SQLITE_PATH', None)
+            with self.assertRaises(CommandError):
+                call_command('benchmark_sqlite_writes', stdout=StringIO())
+
+    def test_cleanup_only_touches_benchmark_users(self):
+        User.objects.create_user('bench-john@gmail.com', 'password', name='John')
+        User.objects.create_user('0-0@bench.invalid', 'password', name='Bench')
+
+        call_command('benchmark_sqlite_writes', threads=1, ops=0, allow_live_database=True, stdout=StringIO())
+
+        self.assertEqual(list(User.objects.values_list('email', flat=True)), ['bench-john@gmail.com'])
+
+
+class SerializedWriteTests(TransactionTestCase):
+
+    def setUp(self):
+        patcher = mock.patch('account.db._write_lock')
+        self.write_lock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @override_settings(SQLITE_SERIALIZE_WRITES=False)
+    def test_noop_when_disabled(self):
+        User.objects.create_user('user@example.com', 'password', name='User')
+        self.write_lock.__enter__.assert_not_called()
+
+    @override_settings(SQLITE_SERIALIZE_WRITES=True)
+    def test_user_save_takes_writer_lock(self):
+        User.objects.create_user('user@example.com', 'password', name='User')
+        self.write_lock.__enter__.assert_called_once()
+
+    @override_settings(SQLITE_SERIALIZE_WRITES=True)
+    def test_skips_writer_lock_inside_transaction(self):
+        with transaction.atomic():
+            User.objects.create_user('user@example.com', 'password', name='User')
+        self.write_lock.__enter__.assert_not_called()
@@ -5,6 +5,9 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from .serializers import *
 from rest_framework.generics import GenericAPIView
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from .audit import record_auth_event
+from .models import AuthEvent
 
 class UserRegisterAPIView(GenericAPIView):
     serializer_class = UserRegisterSerializer
@@ -41,8 +44,15 @@ class UserLoginAPIView(GenericAPIView):
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except ValidationError:
+            get = getattr(request.data, 'get', None)
+            email = str(get('email', '')) if get else ''
+            record_auth_event(AuthEvent.EventType.LOGIN_FAILED, request, email=email[:254])
+            raise
         user = serializer.validated_data
+        record_auth_event(AuthEvent.EventType.LOGIN, request, user=user)
         serializer = CustomUserSerializer(user)
         token = RefreshToken.for_user(user)
         data = serializer.data
@@ -73,6 +83,7 @@ class UserChangePasswordAPIView(GenericAPIView):
         serializer = self.get_serializer(data=request.data, context={'user': request.user})
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        record_auth_event(AuthEvent.EventType.PASSWORD_CHANGE, request, user=request.user)
         return Response({'message': 'Password changed successfully'}, status=status.HTTP_200_OK)
 
 
@@ -93,6 +104,7 @@ class UserPasswordResetAPIView(GenericAPIView):
     def post(self, request, uid, token):
         serializer = self.get_serializer(data=request.data, context={'uid': uid, 'token': token})
         serializer.is_valid(raise_exception=True)
+        record_auth_event(AuthEvent.EventType.PASSWORD_RESET, request, user=serializer.validated_data['user'])
         return Response({'message': 'Password reset successfully'}, status=status.HTTP_200_OK)
 
 
@@ -113,4 +125,5 @@ class VerifyEmailAPIView(GenericAPIView):
     def get(self, request, uid, token):
         serializer = self.get_serializer(data={}, context={'uid': uid, 'token': token})
         serializer.is_valid(raise_exception=True)
+        record_auth_event(AuthEvent.EventType.EMAIL_VERIFIED, request, user=serializer.validated_data['user'])
         return Response({'message': 'Email verified successfully'}, status=status.HTTP_200_OK) 
\ No newline at end of file
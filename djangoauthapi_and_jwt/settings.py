@@ -75,10 +75,33 @@ WSGI_APPLICATION = 'djangoauthapi_and_jwt.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# SQLite deployment mode: WAL journal, tuned pragmas, persistent connections,
+# write transactions that take the lock up front, and in-process write serialization.
+SQLITE_PRODUCTION = os.environ.get('SQLITE_PRODUCTION', 'False') == 'True'
+SQLITE_SERIALIZE_WRITES = os.environ.get('SQLITE_SERIALIZE_WRITES', str(SQLITE_PRODUCTION)) == 'True'
+
+if SQLITE_PRODUCTION:
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS};'
+                f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))};"
+                f"PRAGMA cache_size={int(os.environ.get('SQLITE_CACHE_SIZE', -64000))};"
+            ),
+        },
+    })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -179,4 +202,11 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 CORS_ALLOWED_ORIGINS = os.environ.get(
     'CORS_ALLOWED_ORIGINS', 
     'http://localhost:3000,http://localhost:8080,http://127.0.0.1:8000'
-).split(',')
\ No newline at end of file
+).split(',')
+
+# Auth Event Log
+AUTH_EVENT_BUFFER_SIZE = int(os.environ.get('AUTH_EVENT_BUFFER_SIZE', 100))
+AUTH_EVENT_FLUSH_INTERVAL = float(os.environ.get('AUTH_EVENT_FLUSH_INTERVAL', 5))
+AUTH_EVENT_BACKGROUND_FLUSH = os.environ.get('AUTH_EVENT_BACKGROUND_FLUSH', 'True') == 'True'
+AUTH_EVENT_SPOOL_PATH = os.environ.get('AUTH_EVENT_SPOOL_PATH', str(BASE_DIR / 'auth_events.spool'))
+AUTH_EVENT_RETENTION_DAYS = int(os.environ.get('AUTH_EVENT_RETENTION_DAYS', 90))